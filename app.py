@@ -1,4 +1,5 @@
-from flask import Flask, request
+from flask import Flask, Response, request
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
 from flask_restful import Api, Resource
 from flask_jwt_extended import (
@@ -7,21 +8,38 @@ from flask_jwt_extended import (
     JWTManager,
     get_jwt_identity,
 )
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timezone
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from datetime import datetime, timedelta, timezone
 from flask_cors import CORS
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.schema import CreateColumn, CreateIndex
+import hashlib
+import io
 import os
-import uuid
-from werkzeug.utils import secure_filename
+import re
+import sqlite3
 import json
-
-# Optional HuggingFace imports (initialized lazily)
+import orjson
+import requests
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from PIL import Image
+
+# Optional Aho-Corasick matcher for the filename heuristic
 try:
-    from transformers import pipeline
-    import torch
-    HF_AVAILABLE = True
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
 except Exception:
-    HF_AVAILABLE = False
+    AHOCORASICK_AVAILABLE = False
 
 # -----------------------------
 # APP CONFIG
@@ -29,14 +47,74 @@ except Exception:
 app = Flask(__name__)
 app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///project.db"
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+# Keep SQLite connections open across requests instead of reopening per request
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+    "poolclass": QueuePool,
+    "pool_size": 5,
+    "max_overflow": 10,
+    "pool_pre_ping": True,
+}
 app.config["JWT_SECRET_KEY"] = "supersecret"
 
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Serialize Flask JSON responses with orjson."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=ORJSON_OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+app.json_provider_class = OrjsonProvider
+app.json = OrjsonProvider(app)
+
 CORS(app, resources={r"/api/*": {"origins": "http://localhost:3000"}})
 
 db = SQLAlchemy(app)
 api = Api(app)
+
+
+@api.representation("application/json")
+def output_json(data, code, headers=None):
+    # Flask-RESTful bypasses app.json, so register orjson for resources too
+    return Response(
+        orjson.dumps(data, option=ORJSON_OPTIONS),
+        status=code,
+        headers=headers,
+        mimetype="application/json",
+    )
+
+
 jwt = JWTManager(app)
 
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-64000",
+)
+
+
+@event.listens_for(Engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers proceed during writes and makes commits append-only
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+# argon2-cffi hashes in C and releases the GIL, so concurrent logins overlap
+# across threads instead of serializing on the request thread.
+password_hasher = PasswordHasher()
+
 # -----------------------------
 # DATABASE MODELS
 # -----------------------------
@@ -53,16 +131,38 @@ class User(db.Model):
 
     profile = db.relationship(
         "UserProfile",
-        backref="user",
+        back_populates="user",
         uselist=False,
         cascade="all, delete",
+        # Routes query UserProfile directly; any implicit load raises
+        # instead of silently adding a query to every User load.
+        lazy="raise",
     )
 
+    # Case-insensitive uniqueness; also serves Login's lower(email) lookup
+    __table_args__ = (
+        db.Index("ix_user_email_lower", db.func.lower(email), unique=True),
+    )
+
+    @staticmethod
+    def normalize_email(email):
+        return email.strip().lower()
+
+    @staticmethod
+    def hash_password(raw_password):
+        return password_hasher.hash(raw_password)
+
     def set_password(self, raw_password):
-        self.password = generate_password_hash(raw_password)
+        self.password = self.hash_password(raw_password)
 
     def check_password(self, raw_password):
-        return check_password_hash(self.password, raw_password)
+        # Accounts created before the switch to argon2 keep werkzeug hashes
+        if not self.password.startswith("$argon2"):
+            return check_password_hash(self.password, raw_password)
+        try:
+            return password_hasher.verify(self.password, raw_password)
+        except (VerificationError, InvalidHashError):
+            return False
 
 
 class UserProfile(db.Model):
@@ -89,6 +189,10 @@ class UserProfile(db.Model):
         onupdate=lambda: datetime.now(timezone.utc),
     )
 
+    user = db.relationship("User", back_populates="profile", lazy="raise")
+
+    __table_args__ = (db.Index("ix_user_profile_user_id", "user_id"),)
+
 
 # -----------------------------
 # FOOD ENTRY MODEL + UPLOADS
@@ -100,11 +204,12 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 app.config["MAX_CONTENT_LENGTH"] = 8 * 1024 * 1024  # 8 MB
 
-ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg"}
+# Matches the allowed extensions: png, jpg, jpeg
+_ALLOWED_RE = re.compile(r"\.(png|jpe?g)\Z", re.IGNORECASE)
 
 
 def allowed_file(filename):
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+    return _ALLOWED_RE.search(filename) is not None
 
 
 class FoodEntry(db.Model):
@@ -117,6 +222,22 @@ class FoodEntry(db.Model):
     calories = db.Column(db.Float, nullable=True)
     confidence = db.Column(db.Float, nullable=True)
     created_on = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    # "pending" until background classification stores a result, then
+    # "done"; "failed" if the upload is gone when a retry is attempted
+    status = db.Column(db.String(20), nullable=False, default="done", server_default="done")
+    # When classification was last queued, to spot entries whose task was lost
+    queued_on = db.Column(db.DateTime, nullable=True)
+    # Groq nutrition data and advice for the detected food, if any
+    groq = db.Column(db.JSON, nullable=True)
+    # Name the file was uploaded under, for the filename heuristic on retries
+    upload_name = db.Column(db.String(255), nullable=True)
+
+    # Serves the per-user history query as an index range scan, pre-sorted
+    __table_args__ = (
+        db.Index("ix_food_entry_user_created", "user_id", created_on.desc()),
+        # Lets the orphan sweep find pending entries without a table scan
+        db.Index("ix_food_entry_status_queued", "status", "queued_on"),
+    )
 
 
 # -----------------------------
@@ -124,58 +245,89 @@ class FoodEntry(db.Model):
 # -----------------------------
 
 
-def predict_food(image_path):
+# Local calorie lookup for some common foods (read-only, built once)
+FOOD_CALORIES: Mapping[str, float] = MappingProxyType({
+    "apple": 95.0,
+    "banana": 105.0,
+    "pizza": 285.0,
+    "sandwich": 250.0,
+    "salad": 150.0,
+    "burger": 354.0,
+    "rice": 206.0,
+    "egg": 78.0,
+})
+
+# Single-pass matcher over FOOD_CALORIES keys for the filename heuristic.
+# Each key maps to (position in FOOD_CALORIES, key) so the lowest hit is
+# the key the plain substring scan would have found first.
+if AHOCORASICK_AVAILABLE:
+    _food_automaton = ahocorasick.Automaton()
+    for _rank, _key in enumerate(FOOD_CALORIES):
+        _food_automaton.add_word(_key, (_rank, _key))
+    _food_automaton.make_automaton()
+else:
+    _food_automaton = None
+
+# The classifier runs in inference_server.py; web workers only send it bytes
+INFERENCE_URL = os.environ.get("INFERENCE_URL", "http://127.0.0.1:9090/predict")
+INFERENCE_TIMEOUT_SECONDS = 30
+_inference_session = requests.Session()
+
+# Model predictions keyed by SHA-256 of the uploaded bytes (LRU)
+PREDICTION_CACHE_SIZE = 10_000
+_prediction_cache = OrderedDict()
+_prediction_cache_lock = threading.Lock()
+
+
+def get_cached_prediction(cache_key):
+    """Return the model prediction previously stored for cache_key, if any."""
+    with _prediction_cache_lock:
+        result = _prediction_cache.get(cache_key)
+        if result is not None:
+            _prediction_cache.move_to_end(cache_key)
+        return result
+
+
+def _cache_prediction(cache_key, result):
+    with _prediction_cache_lock:
+        _prediction_cache[cache_key] = result
+        _prediction_cache.move_to_end(cache_key)
+        if len(_prediction_cache) > PREDICTION_CACHE_SIZE:
+            _prediction_cache.popitem(last=False)
+
+
+def predict_food(img_bytes, filename, cache_key=None):
     """
-    Predict food using a Hugging Face image-classification model if available,
-    otherwise fall back to a filename heuristic.
+    Predict food for the uploaded image bytes using the inference server if
+    it is reachable, otherwise fall back to a heuristic on the upload's
+    filename.
+
+    Model predictions are stored under cache_key when one is given; filename
+    heuristic results are not, since they do not depend on the image.
 
     Returns dict: {food_name, calories, confidence}
     """
-    # Local calorie lookup for some common foods
-    FOOD_CALORIES = {
-        "apple": 95.0,
-        "banana": 105.0,
-        "pizza": 285.0,
-        "sandwich": 250.0,
-        "salad": 150.0,
-        "burger": 354.0,
-        "rice": 206.0,
-        "egg": 78.0,
-    }
-
-    # Use HF model when available
-    if HF_AVAILABLE:
-        global _hf_clf
-        try:
-            _hf_clf
-        except NameError:
-            device = 0 if ("torch" in globals() and torch.cuda.is_available()) else -1
-            # model: community Food-101 fine-tuned model
-            try:
-                _hf_clf = pipeline("image-classification", model="nateraw/food-101-resnet50", device=device)
-            except Exception:
-                # If model download fails, disable HF for fallback
-                try:
-                    del _hf_clf
-                except Exception:
-                    pass
-                return _predict_by_filename(image_path, FOOD_CALORIES)
-
-        try:
-            preds = _hf_clf(image_path, top_k=3)
-            # choose the top label
-            top = preds[0]
-            label = top.get("label") if isinstance(top, dict) else str(top)
-            score = float(top.get("score", 0.0))
-            # normalize label (Food-101 labels are typically clean)
-            label_key = label.split(",")[0].lower()
-            calories = FOOD_CALORIES.get(label_key)
-            return {"food_name": label_key, "calories": calories, "confidence": score}
-        except Exception:
-            return _predict_by_filename(image_path, FOOD_CALORIES)
+    try:
+        resp = _inference_session.post(
+            INFERENCE_URL,
+            files={"image": (filename, img_bytes)},
+            timeout=INFERENCE_TIMEOUT_SECONDS,
+        )
+        resp.raise_for_status()
+        top = resp.json()
+        label = top.get("label") if isinstance(top, dict) else str(top)
+        score = float(top.get("score", 0.0))
+    except Exception:
+        # fallback: filename heuristic
+        return _predict_by_filename(filename)
 
-    # fallback: filename heuristic
-    return _predict_by_filename(image_path, FOOD_CALORIES)
+    # normalize label (Food-101 labels are typically clean)
+    label_key = label.split(",")[0].lower()
+    calories = FOOD_CALORIES.get(label_key)
+    result = {"food_name": label_key, "calories": calories, "confidence": score}
+    if cache_key is not None:
+        _cache_prediction(cache_key, result)
+    return result
 
 
 def call_groq(food_name: str, user_goal: str | None):
@@ -232,14 +384,168 @@ def call_groq(food_name: str, user_goal: str | None):
         return None
 
 
-def _predict_by_filename(image_path, FOOD_CALORIES):
-    fname = os.path.basename(image_path).lower()
-    for key in FOOD_CALORIES.keys():
-        if key in fname:
-            return {"food_name": key, "calories": FOOD_CALORIES[key], "confidence": 0.5}
+def _predict_by_filename(filename):
+    fname = os.path.basename(filename).lower()
+    if _food_automaton is not None:
+        hits = (hit for _, hit in _food_automaton.iter(fname))
+        key = min(hits, default=(None, None))[1]
+    else:
+        key = next((key for key in FOOD_CALORIES.keys() if key in fname), None)
+    if key is not None:
+        return {"food_name": key, "calories": FOOD_CALORIES[key], "confidence": 0.5}
     return {"food_name": "unknown", "calories": None, "confidence": 0.0}
 
 
+# Food entries are stored as pending and classified in the background. An
+# entry still pending PENDING_REQUEUE_SECONDS after it was queued lost its
+# task (e.g. to a worker restart); a sweep every PENDING_SWEEP_SECONDS
+# queues such entries again.
+PENDING_FOOD_NAME = "pending"
+PENDING_REQUEUE_SECONDS = 600
+PENDING_SWEEP_SECONDS = 60
+_classification_executor = ThreadPoolExecutor(
+    max_workers=4, thread_name_prefix="food-classifier"
+)
+
+
+def _apply_prediction(entry, result):
+    """Copy a prediction onto entry and mark it done, enriching rice via Groq."""
+    entry.food_name = result.get("food_name", "unknown")
+    entry.calories = result.get("calories")
+    entry.confidence = result.get("confidence", 0.0)
+    entry.groq = None
+    entry.status = "done"
+
+    # If the detected food is rice, enrich with Groq for calories and addons
+    try:
+        if entry.food_name and "rice" in entry.food_name.lower():
+            # load user's fitness goal if available
+            profile = UserProfile.query.filter_by(user_id=entry.user_id).first()
+            user_goal = profile.fitness_goal if profile else None
+            groq_data = call_groq(entry.food_name, user_goal)
+            if groq_data and isinstance(groq_data, dict):
+                entry.groq = groq_data
+                # update calories if provided
+                c = groq_data.get("calories_per_100g")
+                if isinstance(c, (int, float)):
+                    entry.calories = float(c)
+    except Exception:
+        pass
+
+
+def _classify_entry(entry_id, img_bytes, filename, cache_key):
+    """Background task: classify a pending entry and store the result."""
+    result = get_cached_prediction(cache_key)
+    if result is None:
+        result = predict_food(img_bytes, filename, cache_key=cache_key)
+    with app.app_context():
+        try:
+            entry = db.session.get(FoodEntry, entry_id)
+            if entry is None or entry.status != "pending":
+                return
+            _apply_prediction(entry, result)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            app.logger.exception("Failed to store prediction for food entry %s", entry_id)
+
+
+def _is_orphaned():
+    """SQL condition matching pending entries whose classification task was lost."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=PENDING_REQUEUE_SECONDS)
+    return db.and_(
+        FoodEntry.status == "pending",
+        db.or_(FoodEntry.queued_on.is_(None), FoodEntry.queued_on < cutoff),
+    )
+
+
+def _reclassify_entry(entry_id, image_path, upload_name):
+    """Background task: classify an orphaned entry again from its saved upload."""
+    try:
+        with open(image_path, "rb") as f:
+            img_bytes = f.read()
+    except OSError:
+        app.logger.warning("Upload for food entry %s is gone; marking it failed", entry_id)
+        with app.app_context():
+            db.session.execute(
+                db.update(FoodEntry)
+                .where(FoodEntry.entry_id == entry_id)
+                .values(status="failed", food_name="unknown")
+            )
+            db.session.commit()
+        return
+
+    # Uploads are saved as <sha256><ext>, so the saved name is the cache key
+    cache_key = os.path.splitext(os.path.basename(image_path))[0]
+    _classify_entry(entry_id, img_bytes, upload_name or os.path.basename(image_path), cache_key)
+
+
+def _sweep_orphaned_entries():
+    """Queue classification again for pending entries whose task was lost."""
+    with app.app_context():
+        orphans = db.session.execute(
+            db.select(FoodEntry.entry_id, FoodEntry.image_path, FoodEntry.upload_name)
+            .where(_is_orphaned())
+        ).all()
+        for entry_id, image_path, upload_name in orphans:
+            # Claim the entry first so sweeps in other workers do not queue it too
+            claimed = db.session.execute(
+                db.update(FoodEntry)
+                .where(FoodEntry.entry_id == entry_id, _is_orphaned())
+                .values(queued_on=datetime.now(timezone.utc))
+            ).rowcount
+            db.session.commit()
+            if claimed:
+                _classification_executor.submit(
+                    _reclassify_entry, entry_id, image_path, upload_name
+                )
+
+
+def start_orphan_sweeper():
+    """Run _sweep_orphaned_entries now and every PENDING_SWEEP_SECONDS."""
+    def sweep_forever():
+        while True:
+            try:
+                _sweep_orphaned_entries()
+            except Exception:
+                app.logger.exception("Orphaned food entry sweep failed")
+            time.sleep(PENDING_SWEEP_SECONDS)
+
+    threading.Thread(target=sweep_forever, name="food-orphan-sweeper", daemon=True).start()
+
+
+def _food_entries(user_id, entry_id=None):
+    """
+    Return the user's food entries (or just entry_id) as response dicts,
+    newest first.
+    """
+    query = (
+        db.select(
+            FoodEntry.entry_id,
+            FoodEntry.status,
+            FoodEntry.food_name,
+            FoodEntry.calories,
+            FoodEntry.confidence,
+            FoodEntry.groq,
+            FoodEntry.image_path,
+            # SQLite renders created_on as an ISO-8601 string directly
+            db.func.replace(FoodEntry.created_on, " ", "T", type_=db.String).label("created_on"),
+        )
+        .where(FoodEntry.user_id == user_id)
+        .order_by(FoodEntry.created_on.desc())
+    )
+    if entry_id is not None:
+        query = query.where(FoodEntry.entry_id == entry_id)
+
+    out = []
+    for row in db.session.execute(query):
+        entry = row._asdict()
+        if entry["status"] == "pending":
+            entry["food_name"] = None
+        out.append(entry)
+    return out
+
+
 # -----------------------------
 # API RESOURCES
 # -----------------------------
@@ -250,17 +556,23 @@ class Register(Resource):
         data = request.get_json()
         # Only create the user account here. Profile fields are handled
         # separately via the protected profile endpoint.
-        if User.query.filter_by(email=data["email"]).first():
-            return {"message": "Email already exists"}, 400
-
-        new_user = User(
-            name=data.get("name"),
-            email=data.get("email"),
+        # The unique email indexes decide existence in the same statement as
+        # the insert, so there is no separate SELECT and no race between them.
+        user_table = User.__table__
+        stmt = (
+            sqlite_insert(user_table)
+            .values(
+                name=data.get("name"),
+                email=User.normalize_email(data["email"]),
+                password=User.hash_password(data.get("password")),
+            )
+            .on_conflict_do_nothing()
+            .returning(user_table.c.user_id)
         )
-        new_user.set_password(data.get("password"))
-
-        db.session.add(new_user)
+        row = db.session.execute(stmt).first()
         db.session.commit()
+        if row is None:
+            return {"message": "Email already exists"}, 400
 
         return {"message": "User registered successfully"}, 201
 
@@ -270,12 +582,15 @@ class Login(Resource):
     def post(self):
         data = request.get_json()
 
-        user = User.query.filter_by(email=data["email"]).first()
+        # lower() on the column also matches accounts registered before
+        # emails were normalized, via the ix_user_email_lower index
+        user = User.query.filter(
+            db.func.lower(User.email) == User.normalize_email(data["email"])
+        ).first()
 
         if not user or not user.check_password(data["password"]):
             return {"message": "Invalid credentials"}, 401
 
-        access_token = create_access_token(identity=user.user_id)
         # JWT subjects should be strings for some jwt libraries/versions.
         access_token = create_access_token(identity=str(user.user_id))
 
@@ -368,81 +683,69 @@ class Food(Resource):
         if file.filename == "" or not allowed_file(file.filename):
             return {"message": "Invalid or missing image file"}, 400
 
-        filename = secure_filename(file.filename)
-        unique_name = f"{uuid.uuid4().hex}_{filename}"
-        save_path = os.path.join(app.config["UPLOAD_FOLDER"], unique_name)
-        file.save(save_path)
+        # Read the upload once: the same bytes are hashed, written to disk and
+        # sent to the inference server, which decodes them.
+        img_bytes = file.stream.read()
+        # Files are named by content hash plus the validated extension, so
+        # the on-disk name never contains user input and re-uploads of the
+        # same photo share one file and one cached prediction.
+        digest = hashlib.sha256(img_bytes).hexdigest()
+        ext = _ALLOWED_RE.search(file.filename).group(0).lower()
+        save_path = os.path.join(app.config["UPLOAD_FOLDER"], f"{digest}{ext}")
 
-        # Predict and store
-        result = predict_food(save_path)
-        food_name = result.get("food_name", "unknown")
-        calories = result.get("calories")
-        confidence = result.get("confidence", 0.0)
+        try:
+            # Header-only check; pixels are decoded by the inference server
+            Image.open(io.BytesIO(img_bytes))
+        except Exception:
+            return {"message": "Invalid or missing image file"}, 400
 
+        if not os.path.exists(save_path):
+            with open(save_path, "wb") as f:
+                f.write(img_bytes)
+
+        # Every upload is stored as pending and classified in the background
+        # (cached predictions finish almost at once); clients poll
+        # /api/food/<entry_id> until its status is no longer "pending".
         entry = FoodEntry(
             user_id=current_user_id,
             image_path=save_path,
-            food_name=food_name,
-            calories=calories,
-            confidence=confidence,
+            food_name=PENDING_FOOD_NAME,
+            status="pending",
+            queued_on=datetime.now(timezone.utc),
+            upload_name=file.filename,
         )
         db.session.add(entry)
         db.session.commit()
+        _classification_executor.submit(
+            _classify_entry, entry.entry_id, img_bytes, file.filename, digest
+        )
+        (resp,) = _food_entries(current_user_id, entry.entry_id)
+        return resp, 202, {"Location": api.url_for(FoodItem, entry_id=entry.entry_id)}
 
-        # If the detected food is rice, enrich with Groq for calories and addons
-        groq_data = None
+    @jwt_required()
+    def get(self):
+        current_identity = get_jwt_identity()
         try:
-            if food_name and "rice" in food_name.lower():
-                # load user's fitness goal if available
-                profile = UserProfile.query.filter_by(user_id=current_user_id).first()
-                user_goal = profile.fitness_goal if profile else None
-                groq_data = call_groq(food_name, user_goal)
-                if groq_data and isinstance(groq_data, dict):
-                    # update calories if provided
-                    c = groq_data.get("calories_per_100g")
-                    if isinstance(c, (int, float)):
-                        entry.calories = float(c)
-                        db.session.commit()
-        except Exception:
-            groq_data = None
+            current_user_id = int(current_identity)
+        except (TypeError, ValueError):
+            return {"message": "Invalid token subject"}, 422
 
-        resp = {
-            "entry_id": entry.entry_id,
-            "food_name": food_name,
-            "calories": entry.calories,
-            "confidence": confidence,
-        }
-        if groq_data:
-            resp["groq"] = groq_data
+        return {"entries": _food_entries(current_user_id)}, 200
 
-        return resp, 201
 
+class FoodItem(Resource):
     @jwt_required()
-    def get(self):
+    def get(self, entry_id):
         current_identity = get_jwt_identity()
         try:
             current_user_id = int(current_identity)
         except (TypeError, ValueError):
             return {"message": "Invalid token subject"}, 422
 
-        entries = (
-            FoodEntry.query.filter_by(user_id=current_user_id)
-            .order_by(FoodEntry.created_on.desc())
-            .all()
-        )
-        out = []
-        for e in entries:
-            out.append(
-                {
-                    "entry_id": e.entry_id,
-                    "food_name": e.food_name,
-                    "calories": e.calories,
-                    "confidence": e.confidence,
-                    "image_path": e.image_path,
-                    "created_on": e.created_on.isoformat(),
-                }
-            )
-        return {"entries": out}, 200
+        entries = _food_entries(current_user_id, entry_id)
+        if not entries:
+            return {"message": "Food entry not found"}, 404
+        return entries[0], 200
 
 
 # -----------------------------
@@ -452,14 +755,77 @@ api.add_resource(Register, "/api/register")
 api.add_resource(Login, "/api/login")
 api.add_resource(Profile, "/api/profile")
 api.add_resource(Food, "/api/food")
+api.add_resource(FoodItem, "/api/food/<int:entry_id>")
 
 
 # -----------------------------
-# MAIN
+# DATABASE SETUP
 # -----------------------------
-if __name__ == "__main__":
+def init_db():
+    """Create missing tables and indexes, then refresh SQLite's statistics."""
     with app.app_context():
         db.create_all()
+        _add_missing_columns()
+        _check_email_case_duplicates()
+        # create_all() skips existing tables, so add any indexes they lack.
+        # IF NOT EXISTS rather than checkfirst: SQLite reflection does not
+        # report expression indexes such as ix_user_email_lower.
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                db.session.execute(CreateIndex(index, if_not_exists=True))
+        db.session.execute(db.text("PRAGMA optimize"))
+        db.session.commit()
+
+
+def _add_missing_columns():
+    """Add columns introduced since a table was created; create_all() skips those."""
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=db.engine.dialect)
+                db.session.execute(db.text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+
+
+def _check_email_case_duplicates():
+    """
+    Refuse to continue if user emails collide case-insensitively.
+
+    Accounts registered before emails were normalized may differ only in
+    case, which would make creating ix_user_email_lower fail. Merging them
+    would mean choosing whose password and data win, so that is left to an
+    operator.
+    """
+    duplicates = db.session.execute(
+        db.select(db.func.lower(User.email), db.func.group_concat(User.email, ", "))
+        .group_by(db.func.lower(User.email))
+        .having(db.func.count() > 1)
+    ).all()
+    if duplicates:
+        listing = "\n".join(f"  {lowered}: {emails}" for lowered, emails in duplicates)
+        raise RuntimeError(
+            "Cannot create unique index ix_user_email_lower; these accounts "
+            "differ only in email case. Rename or delete all but one of "
+            "each, then start again:\n" + listing
+        )
+
+
+@app.cli.command("init-db")
+def init_db_command():
+    """Create missing tables and indexes."""
+    init_db()
+
+
+# -----------------------------
+# MAIN
+# -----------------------------
+if __name__ == "__main__":
+    init_db()
+    # The debug reloader runs this block in a watcher process too; only
+    # sweep in the child that serves requests.
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_orphan_sweeper()
     app.run(debug=True)
 
 
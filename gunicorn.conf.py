@@ -0,0 +1,28 @@
+# Gunicorn settings: gunicorn app:app
+import os
+import subprocess
+import sys
+
+bind = os.environ.get("GUNICORN_BIND", "127.0.0.1:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", "2"))
+# Password hashing releases the GIL, so threads let logins run in parallel
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+
+
+def on_starting(server):
+    # Create tables and indexes once, in the master, before any worker
+    # starts. A subprocess keeps the master free of app state and open
+    # database connections that forked workers would inherit.
+    subprocess.run(
+        [sys.executable, "-m", "flask", "--app", "app", "init-db"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        check=True,
+    )
+
+
+def post_worker_init(worker):
+    # Each worker re-queues food entries whose classification was lost;
+    # entries are claimed atomically, so workers never queue one twice.
+    from app import start_orphan_sweeper
+
+    start_orphan_sweeper()
@@ -1,9 +1,11 @@
 import requests
 import json
 import os
+import time
 
 BASE = "http://127.0.0.1:5000/api"
 IMAGE_PATH = os.path.join(os.path.dirname(__file__), "how-to-cook-rice.jpg")
+POLL_TIMEOUT_SECONDS = 60
 
 def main():
     # login
@@ -26,5 +28,20 @@ def main():
         except Exception:
             print(r.text)
 
+    # 202 means the entry is classified in the background; poll until done
+    if r.status_code == 202:
+        entry_id = r.json().get("entry_id")
+        deadline = time.monotonic() + POLL_TIMEOUT_SECONDS
+        while True:
+            r = requests.get(f"{BASE}/food/{entry_id}", headers=headers)
+            if r.status_code != 200 or r.json().get("status") != "pending":
+                break
+            if time.monotonic() > deadline:
+                print(f"Still pending after {POLL_TIMEOUT_SECONDS}s, giving up")
+                break
+            time.sleep(0.5)
+        print("ENTRY ->", r.status_code)
+        print(json.dumps(r.json(), indent=2))
+
 if __name__ == "__main__":
     main()
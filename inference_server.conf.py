@@ -0,0 +1,19 @@
+# Gunicorn settings: gunicorn -c inference_server.conf.py inference_server:app
+import os
+
+bind = "127.0.0.1:9090"
+# One process holds the model; threads let concurrent requests form batches
+workers = 1
+threads = 16
+# The worker sends no heartbeat while post_fork loads the model. On first
+# boot that includes the ONNX export or int8 calibration (and model
+# download), far longer than gunicorn's 30 s default.
+timeout = int(os.environ.get("INFERENCE_BOOT_TIMEOUT", "1800"))
+
+
+def post_fork(server, worker):
+    # Load the model in the worker itself (the batching thread would not
+    # survive a fork) before it starts accepting requests.
+    import inference_server
+
+    inference_server.init_classifier()
@@ -0,0 +1,395 @@
+"""
+Standalone Food-101 inference server.
+
+Holds the classifier in a single process so web workers stay lightweight
+and the weights are loaded once. Run with one worker and several threads
+so concurrent requests coalesce into batches:
+
+    gunicorn -c inference_server.conf.py inference_server:app
+
+The model is loaded and warmed up before the first request is accepted:
+in the __main__ block for the dev server, or in gunicorn's post_fork hook.
+"""
+from flask import Flask, request, jsonify
+from PIL import Image
+import glob
+import io
+import json
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+
+# Optional ONNX Runtime imports (preferred on GPU with onnxruntime-gpu)
+try:
+    import onnxruntime as ort
+    import numpy as np
+    ORT_AVAILABLE = True
+except Exception:
+    ORT_AVAILABLE = False
+
+# Optional HuggingFace imports (model is loaded once at startup)
+try:
+    from transformers import (
+        pipeline,
+        AutoConfig,
+        AutoImageProcessor,
+        AutoModelForImageClassification,
+    )
+    import torch
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+    HF_AVAILABLE = True
+except Exception:
+    HF_AVAILABLE = False
+
+# -----------------------------
+# APP CONFIG
+# -----------------------------
+app = Flask(__name__)
+app.config["MAX_CONTENT_LENGTH"] = 8 * 1024 * 1024  # 8 MB
+
+# -----------------------------
+# MODEL
+# -----------------------------
+
+HF_MODEL_NAME = "nateraw/food-101-resnet50"
+
+# Concurrent uploads are coalesced into one forward pass: the batching worker
+# waits up to BATCH_WINDOW_SECONDS after the first request for more to arrive.
+BATCH_WINDOW_SECONDS = 0.03
+MAX_BATCH_SIZE = 16
+
+# ONNX export of the classifier (model.onnx + config.json), created on first boot
+ONNX_MODEL_DIR = os.path.join(app.instance_path, "food101-onnx")
+# Cached int8 TorchScript export of the classifier, reused across CPU boots
+QUANTIZED_MODEL_PATH = os.path.join(app.instance_path, "food101-int8-static.pt")
+# Food photos used to calibrate activation ranges for static quantization;
+# falls back to the bundled sample image when the directory is empty.
+CALIBRATION_DIR = os.path.join(os.path.dirname(__file__), "calibration")
+CALIBRATION_FALLBACK_IMAGE = os.path.join(
+    os.path.dirname(__file__), "how-to-cook-rice.jpg"
+)
+CALIBRATION_SIZE = 16
+
+IMAGE_SIZE = 224
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+_ort_session = None  # ONNX Runtime session
+_hf_clf = None  # CUDA: transformers pipeline
+_int8_model = None  # CPU: statically quantized TorchScript module
+_image_processor = None
+_id2label = None
+_prediction_queue = queue.Queue()
+
+
+def init_classifier():
+    """
+    Load the Food-101 classifier and start the batching worker.
+
+    ONNX Runtime is used first when it can run on the GPU (onnxruntime-gpu).
+    Otherwise the HF pipeline is used on CUDA and an int8-quantized model on
+    CPU, with CPU ONNX Runtime as the last resort. Leaves the classifier
+    unset when no backend can be loaded, in which case predictions use the
+    filename heuristic.
+    """
+    global _hf_clf, _int8_model, _image_processor, _id2label
+    if classifier_ready():
+        return
+
+    # The plain onnxruntime wheel is CPU-only, and on CPU it would run FP32
+    # where the PyTorch backend runs int8, so it only goes first on GPU.
+    ort_on_gpu = ORT_AVAILABLE and "CUDAExecutionProvider" in ort.get_available_providers()
+    if ort_on_gpu:
+        _load_ort_backend()
+
+    if not classifier_ready() and HF_AVAILABLE:
+        try:
+            if torch.cuda.is_available():
+                # model: community Food-101 fine-tuned model
+                clf = pipeline("image-classification", model=HF_MODEL_NAME, device=0)
+                clf.model.to("cuda").eval()
+                clf.model = torch.compile(
+                    clf.model, mode="reduce-overhead", fullgraph=False
+                )
+                _hf_clf = clf
+            else:
+                _image_processor = AutoImageProcessor.from_pretrained(HF_MODEL_NAME)
+                _id2label = AutoConfig.from_pretrained(HF_MODEL_NAME).id2label
+                _int8_model = _load_int8_model()
+        except Exception:
+            app.logger.exception("PyTorch backend unavailable")
+            _hf_clf = _int8_model = None
+
+    if not classifier_ready() and ORT_AVAILABLE and not ort_on_gpu:
+        _load_ort_backend()
+
+    if not classifier_ready():
+        app.logger.error("No classifier backend loaded")
+        return
+
+    _warm_up()
+    threading.Thread(target=_batch_worker, name="food-classifier", daemon=True).start()
+
+
+def _load_ort_backend():
+    global _ort_session, _id2label
+    try:
+        _ort_session, _id2label = _load_onnx_session()
+    except Exception:
+        app.logger.exception("ONNX Runtime backend unavailable")
+        _ort_session = None
+
+
+def classifier_ready():
+    return any(m is not None for m in (_ort_session, _hf_clf, _int8_model))
+
+
+def _warm_up():
+    """
+    Classify blank images so one-off costs (torch.compile, ONNX Runtime
+    allocations, cuDNN autotuning) are paid before the first request.
+
+    The compiled CUDA model recompiles and records new CUDA graphs for each
+    batch size it sees, so it is warmed at every size the batching worker
+    can produce.
+    """
+    blank = Image.new("RGB", (IMAGE_SIZE, IMAGE_SIZE))
+    batch_sizes = range(1, MAX_BATCH_SIZE + 1) if _hf_clf is not None else (1,)
+    try:
+        for batch_size in batch_sizes:
+            _classify_batch([blank] * batch_size)
+    except Exception:
+        app.logger.exception("Classifier warm-up failed")
+
+
+def _load_onnx_session():
+    """Create an optimized ONNX Runtime session, exporting the model on first use."""
+    model_path = os.path.join(ONNX_MODEL_DIR, "model.onnx")
+    config_path = os.path.join(ONNX_MODEL_DIR, "config.json")
+    if not (os.path.exists(model_path) and os.path.exists(config_path)):
+        _export_onnx_model()
+
+    try:
+        return _open_onnx_session(model_path, config_path)
+    except Exception:
+        app.logger.warning("Re-exporting unreadable ONNX model in %s", ONNX_MODEL_DIR)
+        _export_onnx_model()
+        return _open_onnx_session(model_path, config_path)
+
+
+def _export_onnx_model():
+    """
+    Export the classifier to ONNX_MODEL_DIR.
+
+    The export goes to a temp dir that is renamed into place when complete,
+    so an interrupted export is retried on the next boot rather than leaving
+    a partial model behind.
+    """
+    # One-time export; needs optimum, which is not required afterwards
+    from optimum.exporters.onnx import main_export
+
+    parent = os.path.dirname(ONNX_MODEL_DIR)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix=".food101-onnx-")
+    try:
+        main_export(HF_MODEL_NAME, output=tmp_dir, task="image-classification")
+        shutil.rmtree(ONNX_MODEL_DIR, ignore_errors=True)
+        os.replace(tmp_dir, ONNX_MODEL_DIR)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _open_onnx_session(model_path, config_path):
+    with open(config_path) as f:
+        id2label = {int(k): v for k, v in json.load(f)["id2label"].items()}
+
+    sess_options = ort.SessionOptions()
+    sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    available = ort.get_available_providers()
+    providers = [
+        p for p in ("CUDAExecutionProvider", "CPUExecutionProvider") if p in available
+    ]
+    session = ort.InferenceSession(model_path, sess_options, providers=providers)
+    return session, id2label
+
+
+def _preprocess(image):
+    """Resize and normalize one RGB PIL image into a CHW float32 array."""
+    img = image.resize((IMAGE_SIZE, IMAGE_SIZE), Image.BILINEAR)
+    arr = np.asarray(img, dtype=np.float32) / 255.0
+    arr = (arr - np.asarray(IMAGENET_MEAN, dtype=np.float32)) / np.asarray(
+        IMAGENET_STD, dtype=np.float32
+    )
+    return arr.transpose(2, 0, 1)
+
+
+def _calibration_images():
+    """A handful of food photos (plus flips and crops) for int8 calibration."""
+    paths = sorted(
+        path
+        for pattern in ("*.jpg", "*.jpeg", "*.png")
+        for path in glob.glob(os.path.join(CALIBRATION_DIR, pattern))
+    ) or [CALIBRATION_FALLBACK_IMAGE]
+
+    images = []
+    for path in paths:
+        img = Image.open(path).convert("RGB")
+        w, h = img.size
+        images.append(img)
+        images.append(img.transpose(Image.FLIP_LEFT_RIGHT))
+        for scale in (0.75, 0.5):
+            cw, ch = int(w * scale), int(h * scale)
+            left, top = (w - cw) // 2, (h - ch) // 2
+            images.append(img.crop((left, top, left + cw, top + ch)))
+    return images[:CALIBRATION_SIZE]
+
+
+def _as_sequential(model):
+    """
+    Flatten the HF ResNet into a plain Sequential of its layers.
+
+    FX cannot trace ResNetEmbeddings (it branches on the input's channel
+    count), but the layers themselves are traceable, so quantizing them as
+    one graph keeps activations in int8 across the whole network.
+    """
+    resnet = model.resnet
+    return torch.nn.Sequential(
+        resnet.embedder.embedder,
+        resnet.embedder.pooler,
+        *resnet.encoder.stages,
+        resnet.pooler,
+        *model.classifier,
+    ).eval()
+
+
+def _load_int8_model():
+    """Statically quantize the classifier to int8, caching the result on disk."""
+    if os.path.exists(QUANTIZED_MODEL_PATH):
+        try:
+            return torch.jit.load(QUANTIZED_MODEL_PATH).eval()
+        except Exception:
+            app.logger.warning("Re-quantizing unreadable %s", QUANTIZED_MODEL_PATH)
+
+    model = AutoModelForImageClassification.from_pretrained(HF_MODEL_NAME).eval()
+    example = torch.zeros(1, 3, IMAGE_SIZE, IMAGE_SIZE)
+    prepared = prepare_fx(
+        _as_sequential(model),
+        get_default_qconfig_mapping("x86"),
+        example_inputs=(example,),
+    )
+    calibration = _image_processor(
+        images=_calibration_images(), return_tensors="pt"
+    )["pixel_values"]
+    with torch.no_grad():
+        prepared(calibration)
+        traced = torch.jit.trace(convert_fx(prepared), example)
+
+    # Write to a temp file and rename, so an interrupted save never leaves a
+    # truncated model behind for the next boot to load.
+    os.makedirs(os.path.dirname(QUANTIZED_MODEL_PATH), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(QUANTIZED_MODEL_PATH), suffix=".tmp"
+    )
+    os.close(fd)
+    try:
+        torch.jit.save(traced, tmp_path)
+        os.replace(tmp_path, QUANTIZED_MODEL_PATH)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return traced.eval()
+
+
+def _classify_batch(images):
+    """Run one forward pass over all images; returns the top prediction per image."""
+    if _ort_session is not None:
+        pixel_values = np.stack([_preprocess(img) for img in images])
+        logits = _ort_session.run(None, {"pixel_values": pixel_values})[0]
+        exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        probs = exp / exp.sum(axis=-1, keepdims=True)
+        return [
+            {"label": _id2label[int(i)], "score": float(row[i])}
+            for row, i in zip(probs, probs.argmax(axis=-1))
+        ]
+
+    if _int8_model is not None:
+        inputs = _image_processor(images=images, return_tensors="pt")
+        with torch.inference_mode():
+            logits = _int8_model(inputs["pixel_values"])
+        scores, indices = logits.softmax(dim=-1).max(dim=-1)
+        return [
+            {"label": _id2label[int(i)], "score": float(score)}
+            for score, i in zip(scores, indices)
+        ]
+
+    with torch.inference_mode(), torch.autocast("cuda", dtype=torch.float16):
+        preds = _hf_clf(images, batch_size=len(images), top_k=1)
+    return [p[0] if isinstance(p, list) else p for p in preds]
+
+
+def _batch_worker():
+    while True:
+        batch = [_prediction_queue.get()]
+        deadline = time.monotonic() + BATCH_WINDOW_SECONDS
+        while len(batch) < MAX_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_prediction_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        try:
+            preds = _classify_batch([image for image, _ in batch])
+        except Exception as exc:
+            for _, future in batch:
+                future.set_exception(exc)
+            continue
+
+        for (_, future), pred in zip(batch, preds):
+            future.set_result(pred)
+
+
+def enqueue_prediction(image):
+    """Queue a PIL image for the batching worker; the Future resolves to the top prediction."""
+    future = Future()
+    _prediction_queue.put((image, future))
+    return future
+
+
+# -----------------------------
+# ROUTES
+# -----------------------------
+@app.post("/predict")
+def predict():
+    """Accepts multipart/form-data with key 'image'; returns the top label."""
+    if not classifier_ready():
+        return jsonify(message="Classifier not available"), 503
+    if "image" not in request.files:
+        return jsonify(message="No image file provided"), 400
+
+    try:
+        image = Image.open(io.BytesIO(request.files["image"].read()))
+        # JPEGs decode at the smallest 1/2, 1/4 or 1/8 scale that still
+        # covers the model input, instead of at full resolution.
+        image.draft("RGB", (IMAGE_SIZE, IMAGE_SIZE))
+        image = image.convert("RGB")
+    except Exception:
+        return jsonify(message="Invalid image file"), 400
+
+    top = enqueue_prediction(image).result()
+    return jsonify(label=top["label"], score=float(top["score"])), 200
+
+
+# -----------------------------
+# MAIN
+# -----------------------------
+if __name__ == "__main__":
+    init_classifier()
+    app.run(host="127.0.0.1", port=9090, threaded=True)